@@ -2,75 +2,98 @@
 import os
 import re
 import collections
+import csv
 
 # This script walks log files from Aida run-vm TeamCity build configuration
 # stored in the "data" directory (downloaded using download.py script) and
 # constructs CSV tables comparing the total time (totalTime.csv)
 # and txs/sec (txsPerSec.csv) metrics from individual Aida runs (log files).
 
+TOTAL_TIME_RE = re.compile(r'Total elapsed time: ([0-9.]*) s, processed ([0-9.]*) blocks \(~ ([0-9.]*) Tx/s\)')
+
+# The total time is reported at the end of the log, so only its tail is
+# searched first; the rest of the file is scanned line by line only if the
+# tail does not match.
+TAIL_SIZE = 8192
+
+# yields the files in the given directory and all its subdirectories, so both
+# the flat TeamCity layout and the per-job Jenkins layout of "data" are read
+def scan_files(path):
+	with os.scandir(path) as entries:
+		for entry in entries:
+			if entry.is_dir():
+				yield from scan_files(entry.path)
+			elif entry.is_file():
+				yield entry
+
 configs = set()
 buildNumbers = set()
 totalTimeTable = collections.defaultdict(dict)
-buildTxsTable = collections.defaultdict(dict)
+buildTxsTable = {}
 txsPerSecTable = collections.defaultdict(dict)
 commentsTable = collections.defaultdict(dict)
 
-for root, dirs, files in os.walk('data'):
-	for i, file in enumerate(files):
-		if file[-8:] == '.comment':
-			delim = file.find('.')
-			buildNumber = file[:delim]
-			with open('data/' + file, 'r') as f:
-				commentsTable[int(buildNumber)] = f.read()
-		if file[-4:] != '.log':
-			continue
-		delim = file.find('-')
+for entry in scan_files('data'):
+	file = entry.name
+	if file.endswith('.comment'):
+		delim = file.find('.')
 		buildNumber = file[:delim]
-		config = file[delim+1:-4]
-		print(buildNumber + ' ' + config)
-		
-		with open('data/' + file, 'r') as f:
-			content = f.read()
-			x = re.search('Total elapsed time: ([0-9\.]*) s, processed ([0-9\.]*) blocks \(~ ([0-9\.]*) Tx/s\)', content)
-			if x == None:
-				print('unrecognized total time')
-				continue
-			print(x.group(0))
-			totalTime = x.group(1)
-			txsCount = x.group(2)
-			txsPerSec = x.group(3)
-			configs.add(config)
-			buildNumbers.add(int(buildNumber))
-			totalTimeTable[config][int(buildNumber)] = totalTime
-			buildTxsTable[int(buildNumber)] = txsCount
-			txsPerSecTable[config][int(buildNumber)] = txsPerSec
+		with open(entry.path, 'r') as f:
+			commentsTable[int(buildNumber)] = f.read()
+		continue
+	if not file.endswith('.log'):
+		continue
+	delim = file.find('-')
+	buildNumber = file[:delim]
+	config = file[delim+1:-4]
+	print(buildNumber + ' ' + config)
+	
+	with open(entry.path, 'rb', buffering=131072) as f:
+		f.seek(0, os.SEEK_END)
+		f.seek(max(0, f.tell() - TAIL_SIZE))
+		x = TOTAL_TIME_RE.search(f.read().decode(errors='replace'))
+		if x == None:
+			f.seek(0)
+			for line in f:
+				x = TOTAL_TIME_RE.search(line.decode(errors='replace'))
+				if x != None:
+					break
+		if x == None:
+			print('unrecognized total time')
+			continue
+		print(x.group(0))
+		totalTime = x.group(1)
+		txsCount = x.group(2)
+		txsPerSec = x.group(3)
+		configs.add(config)
+		buildNumbers.add(int(buildNumber))
+		totalTimeTable[config][int(buildNumber)] = totalTime
+		buildTxsTable[int(buildNumber)] = txsCount
+		txsPerSecTable[config][int(buildNumber)] = txsPerSec
 
 buildNumbersSorted = sorted(buildNumbers)
 configsSorted = sorted(configs)
 
-with open('totalTime.csv', 'w') as f:
-	f.write("build;txsCount;comment;" + ";".join(configsSorted) + "\n")
-	for buildNumber in buildNumbersSorted:
-		f.write(str(buildNumber) + ";" + buildTxsTable[buildNumber] + ";")
-		if buildNumber in commentsTable:
-			f.write(commentsTable[buildNumber])
-		for config in configsSorted:
-			try:
-				f.write(";" + totalTimeTable[config][buildNumber])
-			except KeyError:
-				f.write(";")
-		f.write("\n")
-
-with open('txsPerSec.csv', 'w') as f:
-	f.write("build;txsCount;comment;" + ";".join(configsSorted) + "\n")
-	for buildNumber in buildNumbersSorted:
-		f.write(str(buildNumber) + ";" + buildTxsTable[buildNumber] + ";")
-		if buildNumber in commentsTable:
-			f.write(commentsTable[buildNumber])
-		for config in configsSorted:
-			try:
-				f.write(";" + txsPerSecTable[config][buildNumber])
-			except KeyError:
-				f.write(";")
-		f.write("\n")
+# transpose the collected values into per-build rows ordered by configsSorted
+configIndex = {config: i for i, config in enumerate(configsSorted)}
+buildIndex = {buildNumber: i for i, buildNumber in enumerate(buildNumbersSorted)}
+totalTimeRows = [[''] * len(configsSorted) for _ in buildNumbersSorted]
+txsPerSecRows = [[''] * len(configsSorted) for _ in buildNumbersSorted]
+for config, values in totalTimeTable.items():
+	for buildNumber, totalTime in values.items():
+		totalTimeRows[buildIndex[buildNumber]][configIndex[config]] = totalTime
+for config, values in txsPerSecTable.items():
+	for buildNumber, txsPerSec in values.items():
+		txsPerSecRows[buildIndex[buildNumber]][configIndex[config]] = txsPerSec
 
+with open('totalTime.csv', 'w', newline='', buffering=1<<20) as totalTimeFile, \
+		open('txsPerSec.csv', 'w', newline='', buffering=1<<20) as txsPerSecFile:
+	totalTimeWriter = csv.writer(totalTimeFile, delimiter=';', lineterminator='\n')
+	txsPerSecWriter = csv.writer(txsPerSecFile, delimiter=';', lineterminator='\n')
+	header = ['build', 'txsCount', 'comment', *configsSorted]
+	totalTimeWriter.writerow(header)
+	txsPerSecWriter.writerow(header)
+	for i, buildNumber in enumerate(buildNumbersSorted):
+		prefix = [buildNumber, buildTxsTable[buildNumber], commentsTable.get(buildNumber, '')]
+		totalTimeWriter.writerow(prefix + totalTimeRows[i])
+		txsPerSecWriter.writerow(prefix + txsPerSecRows[i])
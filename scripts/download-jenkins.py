@@ -1,10 +1,11 @@
 #!/bin/python3
-import collections
+import concurrent.futures
+import io
 
 import requests
 from requests.auth import HTTPBasicAuth
 import os
-import xmltodict
+from xml.etree import ElementTree
 
 # This scripts downloads benchmark results from specified jobs in Jenkins CI into "data" directory.
 
@@ -18,6 +19,10 @@ headers = {
     'Content-Type': 'application/xml'
 }
 
+# one session reuses the TLS connections to Jenkins across all requests
+session = requests.Session()
+session.auth = auth
+
 jenkins = 'https://xapi194.fantom.network'
 jobs = [
     'CompareMainnet8M',
@@ -27,47 +32,91 @@ jobs = [
     'CppFileMainnet50M',
 ]
 
-for job in jobs:
-    jobUrl = jenkins + '/job/Aida/job/' + job
-    os.makedirs('data/' + job, exist_ok=True)
+STAGE_DELIMITER = b'\n[Pipeline] stage\n'
 
-    response = requests.get(jobUrl + '/api/xml?depth=1', headers=headers, auth=auth)
-    if response.status_code != 200:
-        print(response.content)
-        quit(1)
-    jobData = xmltodict.parse(response.content)
+# yields the console log split by STAGE_DELIMITER while it is being downloaded,
+# keeping only the currently incomplete stage in memory
+def split_stages(chunks):
+    buf = bytearray()
+    for chunk in chunks:
+        start = max(0, len(buf) - len(STAGE_DELIMITER) + 1)
+        buf += chunk
+        while True:
+            idx = buf.find(STAGE_DELIMITER, start)
+            if idx < 0:
+                break
+            yield bytes(buf[:idx])
+            del buf[:idx + len(STAGE_DELIMITER)]
+            start = 0
+    yield bytes(buf)
 
-    # iterate builds
-    for i, build in enumerate(jobData['workflowJob']['build']):
-        if not(type(build) is collections.OrderedDict):
+# yields (id, building, result, artifact paths) of the builds listed in the job XML,
+# releasing every build element as soon as it has been parsed
+def parse_builds(content):
+    depth = 0
+    for event, elem in ElementTree.iterparse(io.BytesIO(content), events=('start', 'end')):
+        if event == 'start':
+            depth += 1
             continue
-        buildId = build['id']
-        print(buildId)
-
-        # get console output into XX-phase.log
-        response = requests.get(jobUrl + '/' + buildId + '/consoleText', auth=auth)
-        stagesLogs = response.content.split(b'\n[Pipeline] stage\n')
-        for stageLog in stagesLogs:
-            nameStart = stageLog.find(b'(') + 1
-            nameEnd = stageLog.find(b')')
-            if nameStart == 0:
-                continue
-            name = buildId + '-' + stageLog[nameStart:nameEnd].decode() + '.log'
-            print(' * ' + name)
-            with open('data/' + job + '/' + name, 'wb') as f:
-                f.write(stageLog)
-
-        # get artifacts
-        if 'artifact' in build:
-            for j, artifact in enumerate(build['artifact']):
-                name = artifact['relativePath']
-                print(' * ' + name)
+        depth -= 1
+        if depth != 1 or elem.tag != 'build':
+            continue
+        buildId = elem.findtext('id')
+        if buildId is not None:
+            yield buildId, elem.findtext('building'), elem.findtext('result'), [artifact.findtext('relativePath') for artifact in elem.iterfind('artifact')]
+        elem.clear()
+
+def download_artifact(url, path):
+    if os.path.exists(path):
+        return
+
+    # write into a temporary file first so an interrupted or failed download is not skipped next time
+    with session.get(url, stream=True) as response, open(path + '.part', 'wb', buffering=1<<20) as f:
+        response.raise_for_status()
+        for chunk in response.iter_content(chunk_size=1<<16):
+            f.write(chunk)
+    os.replace(path + '.part', path)
 
-                if os.path.exists('data/' + job + '/' + name):
-                    continue
+with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+    for job in jobs:
+        jobUrl = jenkins + '/job/Aida/job/' + job
+        os.makedirs('data/' + job, exist_ok=True)
 
-                response = requests.get(jobUrl + '/' + buildId + '/artifact/' + name, auth=auth)
-                with open('data/' + job + '/' + name, 'wb') as f:
-                    f.write(response.content)
+        response = session.get(jobUrl + '/api/xml?depth=1', headers=headers)
+        if response.status_code != 200:
+            print(response.content)
+            quit(1)
+
+        # iterate builds
+        for buildId, building, buildResult, artifacts in parse_builds(response.content):
+            print(buildId)
+
+            # get console output into XX-phase.log, finished builds do not change
+            # anymore so their logs are only downloaded once; the marker is written
+            # only after the complete console log of a finished build was stored
+            consoleDone = 'data/' + job + '/' + buildId + '.console-done'
+            if os.path.exists(consoleDone):
+                print(' * console logs already downloaded')
+            else:
+                with session.get(jobUrl + '/' + buildId + '/consoleText', stream=True) as response:
+                    for stageLog in split_stages(response.iter_content(chunk_size=1<<16)):
+                        nameStart = stageLog.find(b'(') + 1
+                        nameEnd = stageLog.find(b')')
+                        if nameStart == 0:
+                            continue
+                        name = buildId + '-' + stageLog[nameStart:nameEnd].decode() + '.log'
+                        print(' * ' + name)
+                        with open('data/' + job + '/' + name, 'wb') as f:
+                            f.write(stageLog)
+                if building == 'false' and buildResult and response.status_code == 200:
+                    open(consoleDone, 'w').close()
+
+            # get artifacts
+            downloads = []
+            for name in artifacts:
+                print(' * ' + name)
+                downloads.append(executor.submit(download_artifact, jobUrl + '/' + buildId + '/artifact/' + name, 'data/' + job + '/' + name))
+            for download in downloads:
+                download.result()
 
 print('Downloading complete')
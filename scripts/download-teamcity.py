@@ -1,7 +1,9 @@
 #!/bin/python3
+import concurrent.futures
+import io
 import requests
 import os
-import xmltodict
+from xml.etree import ElementTree
 
 # This scripts downloads all artifacts from the build configuration in TeamCity
 # into "data" directory.
@@ -16,32 +18,52 @@ headers = {
     'Content-Type': 'application/xml'
 }
 
-response = requests.get('https://team.fantom.network/app/rest/builds/?locator=buildType:Aida_RunVmComparison&fields=build(id,number,status,running,startDate,comment,artifacts(file(name,content)))', headers=headers)
+# one session reuses the TLS connections to TeamCity across all requests
+session = requests.Session()
+session.headers.update(headers)
+
+response = session.get('https://team.fantom.network/app/rest/builds/?locator=buildType:Aida_RunVmComparison&fields=build(id,number,status,running,startDate,comment,artifacts(file(name,content)))')
 
 if response.status_code != 200:
 	print(response.content)
 	quit(1)
 
-dict_data = xmltodict.parse(response.content)
+def download_artifact(name, href):
+	if os.path.exists('data/' + name):
+		return
 
-for i, build in enumerate(dict_data['builds']['build']):
-	print(build['@number'])
+	# write into a temporary file first so an interrupted or failed download is not skipped next time
+	with session.get('https://team.fantom.network' + href, stream=True) as response, open('data/' + name + '.part', 'wb', buffering=1<<20) as f:
+		response.raise_for_status()
+		for chunk in response.iter_content(chunk_size=1<<16):
+			f.write(chunk)
+	os.replace('data/' + name + '.part', 'data/' + name)
 
-	if 'comment' in build:
-		print(build['comment']['text'])
-		with open('data/' + build['@number'] + '.comment', 'w') as f:
-			f.write(build['comment']['text'])
+with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+	downloads = []
+	for event, build in ElementTree.iterparse(io.BytesIO(response.content)):
+		if build.tag != 'build':
+			continue
+		number = build.get('number')
+		print(number)
 
-	for j, artifact in enumerate(build['artifacts']['file']):
-		name = build['@number'] + '-' + artifact['@name']
-		print(' * ' + name + ': ' + artifact['content']['@href'])
+		comment = build.find('comment')
+		if comment is not None:
+			text = comment.findtext('text', '')
+			print(text)
+			with open('data/' + number + '.comment', 'w') as f:
+				f.write(text)
 
-		if os.path.exists('data/' + name):
-			continue
+		for artifact in build.iterfind('artifacts/file'):
+			name = number + '-' + artifact.get('name')
+			href = artifact.find('content').get('href')
+			print(' * ' + name + ': ' + href)
+			downloads.append(executor.submit(download_artifact, name, href))
 
-		response = requests.get('https://team.fantom.network' + artifact['content']['@href'], headers=headers)
-		with open('data/' + name, 'wb') as f:
-			f.write(response.content)
+		# the build has been fully processed, release its subtree
+		build.clear()
 
-print('Downloading complete')
+	for download in downloads:
+		download.result()
 
+print('Downloading complete')